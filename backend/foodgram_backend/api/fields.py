@@ -0,0 +1,45 @@
+import binascii
+
+import pybase64
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from drf_extra_fields import fields
+
+
+class Base64ImageField(fields.Base64ImageField):
+    """Поле для картинки, закодированной в формате Base64.
+       Декодирует данные через pybase64 (SIMD-реализация libbase64)
+       вместо стандартного модуля base64. Файлы из multipart/form-data
+       принимаются как есть, без перекодирования."""
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if hasattr(base64_data, 'read'):
+            return super(fields.Base64FieldMixin, self).to_internal_value(
+                base64_data)
+        if not isinstance(base64_data, str):
+            return super().to_internal_value(base64_data)
+
+        file_mime_type = None
+        header, separator, payload = base64_data.partition(';base64,')
+        if separator:
+            base64_data = payload
+            if self.trust_provided_content_type:
+                file_mime_type = header.replace('data:', '')
+        try:
+            decoded_file = pybase64.b64decode(base64_data)
+        except (TypeError, binascii.Error, ValueError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+
+        file_name = self.get_file_name(decoded_file)
+        file_extension = self.get_file_extension(file_name, decoded_file)
+        if file_extension not in self.ALLOWED_TYPES:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+
+        data = SimpleUploadedFile(
+            name=f'{file_name}.{file_extension}',
+            content=decoded_file,
+            content_type=file_mime_type
+        )
+        return super(fields.Base64FieldMixin, self).to_internal_value(data)
@@ -1,8 +1,10 @@
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer
-from drf_extra_fields.fields import Base64ImageField
 from recipes import models
 from rest_framework import serializers
-from users.models import Subscribers, User
+from users.models import User
+
+from .fields import Base64ImageField
 
 
 class UserProfileSerializer(UserCreateSerializer):
@@ -18,11 +20,7 @@ class UserProfileSerializer(UserCreateSerializer):
         )
 
     def get_is_subscribed(self, user_instance):
-        user = self.context.get('request')
-        return (user and user.user.is_authenticated
-                and Subscribers.objects.filter(
-                    author=user_instance,
-                    user=user.user).exists())
+        return user_instance.id in self.context.get('subscribed_ids', ())
 
     def validate(self, data):
         avatar = self.initial_data.get("avatar")
@@ -43,6 +41,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientResipeSerializer(serializers.ModelSerializer):
     """Вспомогательный cериалайзер для корректного отображения
        Ингредиентов - рецепта."""
+    # Поля нужны только для схемы API: вывод собирает to_representation.
     id = serializers.ReadOnlyField(
         source='ingredient.id')
     name = serializers.ReadOnlyField(
@@ -54,12 +53,21 @@ class IngredientResipeSerializer(serializers.ModelSerializer):
         model = models.RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def to_representation(self, instance):
+        """Собирает словарь напрямую, минуя обход полей сериализатора."""
+        ingredient = instance.ingredient
+        return {
+            'id': ingredient.id,
+            'name': ingredient.name,
+            'measurement_unit': ingredient.measurement_unit,
+            'amount': instance.amount,
+        }
+
 
 class IngredientsInRecipeSerializer(serializers.ModelSerializer):
     """Вспомогательный cериалайзер для корректного добавления
        Ингредиентов в рецепт при его создании."""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=models.Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         help_text='Количество ингредиента',
         min_value=1
@@ -89,22 +97,10 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        return (request.user.is_authenticated
-                and models.FavoriteRecipe.objects.filter(
-                    user=request.user,
-                    recipe=obj
-                ).exists()
-                )
+        return obj.id in self.context.get('favorited_ids', ())
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return (request.user.is_authenticated
-                and models.ShoppingCart.objects.filter(
-                    user=request.user,
-                    recipe=obj
-                ).exists()
-                )
+        return obj.id in self.context.get('in_shopping_cart_ids', ())
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -138,11 +134,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         if not ingredients:
             raise serializers.ValidationError('Не указаны необходимые'
                                               ' ингредиенты для рецепта!')
-        ingredients_id_list = [id['id'] for id in ingredients]
-        if len(ingredients_id_list) != len(set(ingredients_id_list)):
-            raise serializers.ValidationError('Указаны одинаковые '
-                                              'ингредиенты при создании '
-                                              'рецепта!')
+        ingredients_ids = set()
+        for ingredient in ingredients:
+            if ingredient['id'] in ingredients_ids:
+                raise serializers.ValidationError('Указаны одинаковые '
+                                                  'ингредиенты при создании '
+                                                  'рецепта!')
+            ingredients_ids.add(ingredient['id'])
+        missing_ids = ingredients_ids - set(
+            models.Ingredient.objects.filter(
+                id__in=ingredients_ids).values_list('id', flat=True)
+        )
+        if missing_ids:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(missing_ids)))}!')
         if not image:
             raise serializers.ValidationError('Не указана картинка '
                                               'рецепта!')
@@ -166,12 +172,17 @@ class RecipeSerializer(serializers.ModelSerializer):
         models.RecipeIngredient.objects.bulk_create(
             models.RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient['id'],
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             ) for ingredient in ingredients
         )
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], Prefetch(
+            'recipeingredients',
+            queryset=models.RecipeIngredient.objects.select_related(
+                'ingredient')
+        ))
         return ShowRecipeSerializer(instance, context=self.context).data
 
 
@@ -186,7 +197,7 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
 
 class SubscriptionSerializer(UserProfileSerializer):
     recipes = serializers.SerializerMethodField(method_name="get_recipes")
-    recipes_count = serializers.ReadOnlyField(source="recipes.count")
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -202,9 +213,11 @@ class SubscriptionSerializer(UserProfileSerializer):
 
         if recipes_limit:
             try:
-                recipes = recipes[:int(recipes_limit)]
+                limit = int(recipes_limit)
             except ValueError:
-                pass
+                limit = 0
+            if limit > 0:
+                recipes = recipes[:limit]
 
         return RecipeMinifiedSerializer(
             recipes, context={"request": request}, many=True
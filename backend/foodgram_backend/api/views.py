@@ -1,9 +1,15 @@
-from django.db.models import Exists, F, OuterRef, Sum
+from functools import lru_cache, partial
+
+from django.db.models import (Count, Exists, OuterRef, Prefetch, Sum,
+                              prefetch_related_objects)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from djoser.views import UserViewSet
-from recipes.models import FavoriteRecipe, Ingredient, Recipe, ShoppingCart
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart)
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -15,62 +21,115 @@ from .paginations import Pagination
 from .permissions import IsAuthorOrReadOnly
 
 
+@lru_cache(maxsize=None)
+def get_short_link_prefix():
+    """Префикс короткой ссылки на рецепт.
+       Вычисляется один раз при первом обращении: на этапе импорта
+       модуля конфигурация URL еще не загружена."""
+    return reverse('short-link', kwargs={'pk': 0})[:-len('0/')]
+
+
+class UserRelationsContextMixin:
+    """Вспомогательный миксин: одним запросом на каждую связь выбирает
+       id подписок, избранного и корзины текущего пользователя
+       и передает их в контекст сериализатора. Запрос выполняется
+       только при первом обращении к множеству, а сами множества
+       запоминаются на объекте запроса и переиспользуются всеми
+       сериализаторами в его рамках. Для страницы списка множества
+       ограничиваются объектами этой страницы."""
+    user_relations = {
+        'subscribed_ids': (Subscribers, 'author_id'),
+        'favorited_ids': (FavoriteRecipe, 'recipe_id'),
+        'in_shopping_cart_ids': (ShoppingCart, 'recipe_id'),
+    }
+    # Атрибут объекта страницы, по которому ограничивается множество.
+    page_related_fields = {}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.user.is_authenticated:
+            for key in self.user_relations:
+                context[key] = self.get_related_ids(key)
+        return context
+
+    def get_related_ids(self, key):
+        related_ids = getattr(self.request, '_related_ids', None)
+        if related_ids is None:
+            self.request._related_ids = related_ids = {}
+        if key not in related_ids:
+            model, field = self.user_relations[key]
+            related_ids[key] = SimpleLazyObject(partial(
+                self.fetch_related_ids, model, field, self.request.user))
+        return related_ids[key]
+
+    def get_page_serializer_context(self, page):
+        context = self.get_serializer_context()
+        if self.request.user.is_authenticated:
+            for key, attr in self.page_related_fields.items():
+                model, field = self.user_relations[key]
+                context[key] = self.fetch_related_ids(
+                    model, field, self.request.user,
+                    {getattr(obj, attr) for obj in page}
+                )
+        return context
+
+    @staticmethod
+    def fetch_related_ids(model, field, user, ids=None):
+        queryset = model.objects.filter(user=user).order_by()
+        if ids is not None:
+            queryset = queryset.filter(**{f'{field}__in': ids})
+        return set(queryset.values_list(field, flat=True))
+
+
 class BaseFilterViewSet(viewsets.ModelViewSet):
     """Вспомогательный вьюсет для работы фильтрации."""
     pagination_class = Pagination
 
+    user_flag_filters = {
+        'is_favorited': FavoriteRecipe,
+        'is_in_shopping_cart': ShoppingCart,
+    }
+
     def filter_queryset(self, queryset):
         request = self.request
-        filters = {
-            'is_favorited': request.query_params.get('is_favorited'),
-            'is_in_shopping_cart': request.query_params.get(
-                'is_in_shopping_cart'
-            ),
-            'author_id': request.query_params.get('author')
-        }
 
         if request.user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(FavoriteRecipe.objects.filter(
-                    user=request.user, recipe=OuterRef('pk'))),
-                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+            for param, model in self.user_flag_filters.items():
+                value = request.query_params.get(param)
+                if value not in ('0', '1'):
+                    continue
+                condition = Exists(model.objects.filter(
                     user=request.user, recipe=OuterRef('pk')))
-            )
-
-            if filters['is_favorited'] in ['0', '1']:
-                queryset = queryset.filter(
-                    is_favorited=(filters['is_favorited'] == '1')
-                )
-
-            if filters['is_in_shopping_cart'] in ['0', '1']:
                 queryset = queryset.filter(
-                    is_in_shopping_cart=(filters['is_in_shopping_cart'] == '1')
-                )
+                    condition if value == '1' else ~condition)
 
-        if filters['author_id']:
-            queryset = queryset.filter(author_id=filters['author_id'])
+        author_id = request.query_params.get('author')
+        if author_id:
+            queryset = queryset.filter(author_id=author_id)
 
         return queryset
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        return self.filter_queryset(queryset)
+    def get_page_serializer_context(self, page):
+        return self.get_serializer_context()
 
     def get_paginated_response_data(self, queryset):
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = self.get_serializer(
+                page, many=True,
+                context=self.get_page_serializer_context(page)
+            )
             return self.get_paginated_response(serializer.data)
         return Response(self.get_serializer(queryset, many=True).data)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         return self.get_paginated_response_data(queryset)
 
 
-class UserProfileViewSet(UserViewSet):
+class UserProfileViewSet(UserRelationsContextMixin, UserViewSet):
     """Вьюсет для пользователей."""
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('username')
     serializer_class = serializers.UserProfileSerializer
     pagination_class = Pagination
 
@@ -79,14 +138,24 @@ class UserProfileViewSet(UserViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
 
+    @staticmethod
+    def get_recipes_prefetch():
+        """Рецепты автора только с полями краткого представления."""
+        return Prefetch('recipes', queryset=Recipe.objects.only(
+            *serializers.RecipeMinifiedSerializer.Meta.fields, 'author'))
+
     @action(methods=['GET'], detail=False)
     def subscriptions(self, request):
-        subscriptions = Subscribers.objects.filter(user=request.user)
-        page = self.paginate_queryset(subscriptions)
+        authors = User.objects.filter(
+            authors__user=request.user
+        ).annotate(
+            recipes_count=Count('recipes')
+        ).prefetch_related(self.get_recipes_prefetch()).order_by('username')
+        page = self.paginate_queryset(authors)
         serializer = serializers.SubscriptionSerializer(
-            [sub.author for sub in page],
+            page,
             many=True,
-            context={'request': request}
+            context=self.get_serializer_context()
         )
         return self.get_paginated_response(serializer.data)
 
@@ -95,40 +164,47 @@ class UserProfileViewSet(UserViewSet):
             permission_classes=[permissions.IsAuthenticated],
             url_path=r'(?P<id>\d+)/subscribe')
     def subscribe(self, request, id):
-        author = get_object_or_404(User, id=id)
-
-        if request.method == 'POST':
-            if author == request.user:
+        if request.method == 'DELETE':
+            deleted, _ = Subscribers.objects.filter(
+                author_id=id, user=request.user).delete()
+            if not deleted:
+                get_object_or_404(User.objects.only('id'), id=id)
                 raise ValidationError(
-                    {'error': 'Нельзя подписаться на самого себя!'})
+                    {'error': 'Вы не подписаны на этого автора!'})
 
-            subscription, created = Subscribers.objects.get_or_create(
-                author=author, user=request.user)
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
-            if not created:
-                raise ValidationError(
-                    {'error': 'Вы уже подписаны на этого автора!'})
+        author = get_object_or_404(
+            User.objects.annotate(recipes_count=Count('recipes')), id=id)
 
-            return Response(
-                serializers.SubscriptionSerializer(
-                    author, context={'request': request}).data,
-                status=status.HTTP_201_CREATED
-            )
+        if author == request.user:
+            raise ValidationError(
+                {'error': 'Нельзя подписаться на самого себя!'})
 
-        if request.method == 'DELETE':
-            get_object_or_404(
-                Subscribers, author=author, user=request.user
-            ).delete()
+        subscription, created = Subscribers.objects.get_or_create(
+            author=author, user=request.user)
 
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        if not created:
+            raise ValidationError(
+                {'error': 'Вы уже подписаны на этого автора!'})
+
+        prefetch_related_objects([author], self.get_recipes_prefetch())
+
+        return Response(
+            serializers.SubscriptionSerializer(
+                author, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
 
     @action(methods=['GET'],
             detail=False,
             permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
-        user = request.user
+        context = self.get_serializer_context()
+        # На самого себя подписаться нельзя, запрос подписок не нужен.
+        context['subscribed_ids'] = frozenset()
         serializer = serializers.UserProfileSerializer(
-            user, context={'request': request}
+            request.user, context=context
         )
         return Response(serializer.data)
 
@@ -145,20 +221,36 @@ class UserProfileViewSet(UserViewSet):
 
             serializer = self.get_serializer(user, data=data, partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            user.avatar = serializer.validated_data['avatar']
+            user.save(update_fields=['avatar'])
             return Response({'avatar': serializer.data['avatar']})
 
-        if user.avatar and user.avatar.path:
-            user.avatar.delete()
+        if user.avatar:
+            user.avatar.delete(save=False)
         user.avatar = None
-        user.save()
+        user.save(update_fields=['avatar'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(BaseFilterViewSet):
+class RecipeViewSet(UserRelationsContextMixin, BaseFilterViewSet):
     """Вьюсет для рецептов."""
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.select_related('author').only(
+        'id', 'author', 'name', 'image', 'text', 'cooking_time',
+        *[f'author__{field}'
+          for field in serializers.UserProfileSerializer.Meta.fields
+          if field != 'is_subscribed']
+    ).prefetch_related(
+        Prefetch(
+            'recipeingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        )
+    )
     serializer_class = serializers.RecipeSerializer
+    page_related_fields = {
+        'subscribed_ids': 'author_id',
+        'favorited_ids': 'id',
+        'in_shopping_cart_ids': 'id',
+    }
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
 
@@ -169,70 +261,57 @@ class RecipeViewSet(BaseFilterViewSet):
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk):
-        url = request.build_absolute_uri(reverse(
-            'short-link', kwargs={'pk': pk}))
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        url = request.build_absolute_uri(
+            f'{get_short_link_prefix()}{recipe.id}/')
         return Response(data={"short-link": url})
 
     @action(methods=['GET'],
             detail=False,
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
-        shoppingcart = ShoppingCart.objects.filter(user=request.user).values(
-            'recipe_id__ingredients__name'
-        ).annotate(
-            amount=Sum('recipe_id__recipeingredients__amount'),
-            measurement_unit=F('recipe_id__ingredients__measurement_unit')
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__shopping_carts__user=request.user
+        ).values(
+            'ingredient__name', 'ingredient__measurement_unit'
+        ).annotate(amount=Sum('amount')).order_by(
+            'ingredient__name'
+        ).values_list(
+            'ingredient__name', 'amount', 'ingredient__measurement_unit'
         )
-
-        ingredients = self.aggregate_ingredients(shoppingcart)
-        recipes = ShoppingCart.objects.filter(user=request.user).values(
-            'recipe_id__name',
-            'recipe_id__author__username'
-        ).distinct()
-
-        report_date = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        report_content = (
-            '\n'.join([
-                f'Список покупок на дату {report_date}:',
-                'Продукты:',
-                *[
-                    f"{ingredient.capitalize()} - "
-                    f"{amount} ({measurement_unit})"
-                    for ingredient, (amount, measurement_unit)
-                    in ingredients.items()
-                ],
-                'Рецепты:',
-                *[f"{recipe['recipe_id__name']} от "
-                  f"{recipe['recipe_id__author__username']}"
-                  for recipe in recipes],
-            ])
+        recipes = ShoppingCart.objects.filter(user=request.user).values_list(
+            'recipe__name',
+            'recipe__author__username'
         )
 
-        return Response(report_content, content_type='text/plain')
-
-    def aggregate_ingredients(self, shoppingcart):
-        ingredients = {}
-        for ingredient in shoppingcart:
-            ingredient_name = ingredient['recipe_id__ingredients__name']
-            amount = ingredient['amount']
-            measurement_unit = ingredient['measurement_unit']
-            ingredients[ingredient_name] = (
-                ingredients.get(
-                    ingredient_name, (0, measurement_unit))[0] + amount,
-                measurement_unit
-            )
+        report_date = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        return ingredients
+        def report_lines():
+            yield f'Список покупок на дату {report_date}:\n'
+            yield 'Продукты:\n'
+            for name, amount, unit in ingredients.iterator(chunk_size=500):
+                yield f'{name.capitalize()} - {amount} ({unit})\n'
+            yield 'Рецепты:\n'
+            for name, author in recipes.iterator(chunk_size=500):
+                yield f'{name} от {author}\n'
+
+        return StreamingHttpResponse(
+            report_lines(),
+            content_type='text/plain; charset=utf-8',
+            headers={
+                'Content-Disposition':
+                    'attachment; filename="shopping_cart.txt"'
+            }
+        )
 
     @action(methods=['POST', 'DELETE'],
             detail=False,
             permission_classes=[permissions.IsAuthenticated],
             url_path=r'(?P<id>\d+)/shopping_cart')
     def shopping_cart(self, request, id):
-        recipe = get_object_or_404(Recipe, id=id)
         return self.update_cart_favorite(
             request,
-            recipe,
+            id,
             ShoppingCart,
             'Рецепт уже добавлен!',
             'Рецепт не найден в корзине.'
@@ -243,19 +322,23 @@ class RecipeViewSet(BaseFilterViewSet):
             permission_classes=[permissions.IsAuthenticated],
             url_path='favorite')
     def favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
         return self.update_cart_favorite(
-            request, recipe,
+            request, pk,
             FavoriteRecipe,
             'Рецепт уже добавлен в избранное!',
             'Рецепт не найден в избранном.'
         )
 
     @staticmethod
-    def update_cart_favorite(request, recipe, model,
+    def update_cart_favorite(request, pk, model,
                              already_added_msg, not_found_msg):
+        recipe = get_object_or_404(
+            Recipe.objects.only(
+                *serializers.RecipeMinifiedSerializer.Meta.fields),
+            pk=pk
+        )
         if request.method == 'POST':
-            obj, created = model.objects.get_or_create(
+            _, created = model.objects.get_or_create(
                 user=request.user, recipe=recipe)
             if not created:
                 raise ValidationError(already_added_msg)
@@ -266,7 +349,10 @@ class RecipeViewSet(BaseFilterViewSet):
                 status=status.HTTP_201_CREATED
             )
 
-        get_object_or_404(model, user=request.user, recipe=recipe).delete()
+        deleted, _ = model.objects.filter(
+            user=request.user, recipe=recipe).delete()
+        if not deleted:
+            raise ValidationError(not_found_msg)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -285,3 +371,7 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
         if name:
             queryset = queryset.filter(name__istartswith=name)
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        return Response(list(self.get_queryset().values(
+            *serializers.IngredientSerializer.Meta.fields)))
@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
+from import_export import resources
 from import_export.admin import ImportExportActionModelAdmin
 from users.models import Subscribers, User
 
@@ -17,20 +20,39 @@ class SubscribersInline(admin.TabularInline):
 class AdminUser(UserAdmin):
     """Настройка Админки-Пользователей."""
 
-    @admin.display(description='Подписчики')
+    @staticmethod
+    def count_subquery(queryset, field):
+        """Коррелированный подзапрос с количеством строк queryset,
+           у которых field указывает на текущего пользователя."""
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count')
+        ), 0)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=self.count_subquery(Recipe.objects, 'author'),
+            subscriptions_count=self.count_subquery(
+                Subscribers.objects, 'user'),
+            subscribers_count=self.count_subquery(
+                Subscribers.objects, 'author')
+        )
+
+    @admin.display(description='Подписчики', ordering='subscribers_count')
     def get_subscribers(self, obj):
         """Функция для корректного отображения подписчиков."""
-        return obj.authors.count()
+        return obj.subscribers_count
 
-    @admin.display(description='Рецепты')
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def get_recipes_count(self, obj):
         """Количество рецептов пользователя."""
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Подписки')
+    @admin.display(description='Подписки', ordering='subscriptions_count')
     def get_subscriptions_count(self, obj):
         """Количество подписок пользователя."""
-        return obj.subscribers.count()
+        return obj.subscriptions_count
 
     @mark_safe
     def get_avatar(self, obj):
@@ -55,13 +77,28 @@ class AdminUser(UserAdmin):
     ordering = ('username',)
 
 
+class IngredientResource(resources.ModelResource):
+    """Импорт и экспорт ингредиентов.
+       Экспорт читает таблицу через iterator() пачками по chunk_size
+       строк, не загружая ее в память целиком."""
+
+    class Meta:
+        model = Ingredient
+        chunk_size = 2000
+
+
 class IngredientAdmin(ImportExportActionModelAdmin, admin.ModelAdmin):
     """Настройка Админки-Ингредиентов."""
+    resource_classes = (IngredientResource,)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count('recipeingredients'))
 
-    @admin.display(description='Рецепты')
+    @admin.display(description='Рецепты', ordering='recipes_count')
     def get_recipes_count(self, obj):
         """Количество рецептов, использующих данный ингредиент."""
-        return obj.recipeingredients.count()
+        return obj.recipes_count
 
     list_display = (
         'id',
@@ -83,6 +120,18 @@ class RecipeIngredientInline(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
     """Настройка Админки-Рецептов."""
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).annotate(
+            favorites_count=Count('favorites')
+        ).prefetch_related(
+            Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
     @mark_safe
     def get_image(self, obj):
         """Метод для отображения картинки рецепта в админке."""
@@ -101,10 +150,10 @@ class RecipeAdmin(admin.ModelAdmin):
             for ingredient in obj.recipeingredients.all()
         )
 
-    @admin.display(description='Избранное')
+    @admin.display(description='Избранное', ordering='favorites_count')
     def get_favorites_count(self, obj):
         """Количество раз, когда рецепт добавлялся в избранное."""
-        return obj.favorites.count()
+        return obj.favorites_count
 
     list_display = (
         'id',
@@ -0,0 +1,53 @@
+import csv
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Ingredient
+
+BATCH_SIZE = 1000
+DEFAULT_PATH = settings.BASE_DIR.parent.parent / 'data' / 'ingredients.json'
+
+
+class Command(BaseCommand):
+    """Загрузка списка продуктов из файла JSON или CSV.
+       Уже существующие продукты пропускаются."""
+    help = 'Загружает ингредиенты из data/ingredients.json или .csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', type=Path, default=DEFAULT_PATH,
+            help=f'Путь к файлу, по умолчанию {DEFAULT_PATH}'
+        )
+
+    def read_rows(self, path):
+        """Строки файла без повторов, в исходном порядке."""
+        with open(path, encoding='utf-8') as file:
+            if path.suffix == '.csv':
+                rows = ((name, unit) for name, unit in csv.reader(file))
+            else:
+                rows = ((row['name'], row['measurement_unit'])
+                        for row in json.load(file))
+            return list(dict.fromkeys(rows))
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            rows = self.read_rows(path)
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+        with transaction.atomic():
+            before = Ingredient.objects.count()
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in rows),
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True
+            )
+            created = Ingredient.objects.count() - before
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено ингредиентов: {created} из {len(rows)}'))
@@ -1,5 +1,7 @@
+from django.contrib.postgres.indexes import OpClass
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
 from users.models import User
 
 
@@ -25,6 +27,10 @@ class Ingredient(models.Model):
             fields=['name', 'measurement_unit'],
             name='unique_name_measurement_unit'
         )]
+        indexes = [models.Index(
+            OpClass(Upper('name'), name='text_pattern_ops'),
+            name='ingredient_name_prefix_idx'
+        )]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-15 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscribers',
+            index=models.Index(fields=['user', 'author'], name='subs_user_author_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-15 09:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_subs_user_author_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscribers',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+    ]
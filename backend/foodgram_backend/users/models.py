@@ -43,7 +43,6 @@ class User(AbstractUser):
         help_text='Прикрепите аватар')
 
     class Meta:
-        ordering = ('username',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
@@ -69,7 +68,6 @@ class Subscribers(models.Model):
     )
 
     class Meta:
-        ordering = ('author',)
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         constraints = [
@@ -82,6 +80,10 @@ class Subscribers(models.Model):
                 name='author_and_user_different',
             )
         ]
+        indexes = [models.Index(
+            fields=['user', 'author'],
+            name='subs_user_author_idx'
+        )]
 
     def __str__(self):
         return f"{self.author} - {self.user}"